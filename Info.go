@@ -24,6 +24,8 @@ const (
 	DefaultFilenameFormat = "%(title)s-%(id)s"
 	// 5 days in seconds
 	LiveMaximumSeekable = 432000
+	// Fragments are a few MiB, don't trust a Content-Length far beyond that
+	MaxFragPresize = 64 << 20
 )
 
 type VideoItag struct {
@@ -53,6 +55,14 @@ var (
 		"2160p60":    {H264: 305, VP9: 315},
 	}
 
+	/*
+		Fragment data buffers are recycled between fragments so that each
+		download does not need to allocate and grow a fresh multi-MiB buffer
+	*/
+	fragBufferPool = sync.Pool{
+		New: func() interface{} { return new(bytes.Buffer) },
+	}
+
 	VideoQualities = []string{
 		"audio_only",
 		"144p",
@@ -122,6 +132,9 @@ type fragThreadState struct {
 	Is403        bool
 	ToFile       bool
 	SleepTime    time.Duration
+	URLTemplate  string
+	URLPrefix    string
+	URLSuffix    string
 }
 
 type MediaDLInfo struct {
@@ -149,6 +162,8 @@ Miscellaneous information
 */
 type DownloadInfo struct {
 	sync.RWMutex
+	refreshLock sync.Mutex
+
 	FormatInfo FormatInfo
 	Metadata   MetaInfo
 	CookiesURL *url.URL
@@ -257,22 +272,35 @@ func (di *DownloadInfo) IsLive() bool {
 	return di.Live
 }
 
+func (di *DownloadInfo) SetLive(live bool) {
+	di.Lock()
+	defer di.Unlock()
+	di.Live = live
+}
+
 func (di *DownloadInfo) IsUnavailable() bool {
 	di.RLock()
 	defer di.RUnlock()
 	return di.Unavailable
 }
 
+func (di *DownloadInfo) SetUnavailable() {
+	di.Lock()
+	defer di.Unlock()
+	di.Unavailable = true
+}
+
 func (di *DownloadInfo) IsGVideoDDL() bool {
 	di.RLock()
 	defer di.RUnlock()
 	return di.GVideoDDL
 }
 
-func (di *DownloadInfo) GetActiveJobCount(dataType string) int {
+// Get the active job count and whether the download is finished while only locking once
+func (di *DownloadInfo) GetJobStatus(dataType string) (int, bool) {
 	di.MDLInfo[dataType].RLock()
 	defer di.MDLInfo[dataType].RUnlock()
-	return di.MDLInfo[dataType].ActiveJobs
+	return di.MDLInfo[dataType].ActiveJobs, di.MDLInfo[dataType].Finished
 }
 
 func (di *DownloadInfo) IncrementJobs(dataType string) {
@@ -305,10 +333,11 @@ func (di *DownloadInfo) SetDownloadUrl(dataType, dlURL string) {
 	di.MDLInfo[dataType].DownloadURL = dlURL
 }
 
-func (di *DownloadInfo) GetDownloadUrlHost(dataType string) string {
+// Get both the download URL and its host while only locking once
+func (di *DownloadInfo) GetDownloadUrlAndHost(dataType string) (string, string) {
 	di.MDLInfo[dataType].RLock()
 	defer di.MDLInfo[dataType].RUnlock()
-	return di.MDLInfo[dataType].URLHost
+	return di.MDLInfo[dataType].DownloadURL, di.MDLInfo[dataType].URLHost
 }
 
 func (di *DownloadInfo) GetBaseFilePath(dataType string) string {
@@ -391,7 +420,8 @@ func (di *DownloadInfo) printChannelAndTitle(pr *PlayerResponse) {
 
 func (di *DownloadInfo) printStatusWithoutLock() {
 	if loglevel >= LoglevelError {
-		fmt.Print(di.Status)
+		// Status is already fully formatted, no need to go through fmt
+		os.Stdout.WriteString(di.Status)
 	}
 }
 
@@ -580,9 +610,14 @@ Prioritize DASH manifest if it is available.
 Attempts to grab from an Android player response as well as desktop,
 favouring Android. Any formats not found in Android are looked for in the
 desktop player response.
+Also returns the last sequence number found in the DASH manifests, for the
+caller to publish along with the URLs.
 */
-func (di *DownloadInfo) GetDownloadUrls(pr *PlayerResponse) map[int]string {
+func (di *DownloadInfo) GetDownloadUrls(pr *PlayerResponse) (map[int]string, int) {
 	urls := make(map[int]string)
+	di.RLock()
+	lastSq := di.LastSq
+	di.RUnlock()
 	androidPR, err := di.DownloadAndroidPlayerResponse()
 
 	if err != nil {
@@ -593,7 +628,7 @@ func (di *DownloadInfo) GetDownloadUrls(pr *PlayerResponse) map[int]string {
 			manifest := DownloadData(androidPR.StreamingData.DashManifestURL)
 			if len(manifest) > 0 {
 				// we store the LastSq to calculate 5 days past
-				urls, di.LastSq = GetUrlsFromManifest(manifest)
+				urls, lastSq = GetUrlsFromManifest(manifest)
 			}
 
 			for itag := range urls {
@@ -622,9 +657,9 @@ func (di *DownloadInfo) GetDownloadUrls(pr *PlayerResponse) map[int]string {
 		manifest := DownloadData(pr.StreamingData.DashManifestURL)
 		if len(manifest) > 0 {
 			// we store the LastSq to calculate 5 days past
-			dashUrls, lastSq := GetUrlsFromManifest(manifest)
-			if lastSq > di.LastSq {
-				di.LastSq = lastSq
+			dashUrls, webLastSq := GetUrlsFromManifest(manifest)
+			if webLastSq > lastSq {
+				lastSq = webLastSq
 			}
 
 			for itag, url := range dashUrls {
@@ -653,29 +688,43 @@ func (di *DownloadInfo) GetDownloadUrls(pr *PlayerResponse) map[int]string {
 		}
 	}
 
-	return urls
+	return urls, lastSq
 }
 
 // Get necessary video info such as video/audio URLs
 func (di *DownloadInfo) GetVideoInfo() bool {
-	di.Lock()
-	defer di.Unlock()
+	/*
+		Only one refresh runs at a time, but the main lock is not held while
+		talking to youtube. Holding it would stall every fragment downloader
+		and status print for the length of the requests.
+	*/
+	di.refreshLock.Lock()
+	defer di.refreshLock.Unlock()
 
+	di.RLock()
 	/*
 		No point retrieving information if we know it's not available, or there
 		is nothing useful to be gotten
 	*/
-	if di.GVideoDDL || di.Stopping || di.Unavailable {
-		return false
-	}
-
+	skip := di.GVideoDDL || di.Stopping || di.Unavailable
 	// Almost nothing we care about is likely to change in 15 seconds
-	delta := time.Since(di.LastUpdated)
-	if delta < (DefaultPollTime * time.Second) {
+	skip = skip || time.Since(di.LastUpdated) < (DefaultPollTime*time.Second)
+	di.RUnlock()
+
+	if skip {
 		return false
 	}
 
+	var dlUrls map[int]string
+	var lastSq int
 	retrieved, pr, selQaulities := di.GetPlayablePlayerResponse()
+	if retrieved == PlayerResponseFound {
+		dlUrls, lastSq = di.GetDownloadUrls(pr)
+	}
+
+	di.Lock()
+	defer di.Unlock()
+
 	di.LastUpdated = time.Now()
 	if retrieved == PlayerResponseNotFound {
 		di.Live = false
@@ -685,15 +734,17 @@ func (di *DownloadInfo) GetVideoInfo() bool {
 		return false
 	}
 
-	streamData := pr.StreamingData
-	pmfr := pr.Microformat.PlayerMicroformatRenderer
+	di.LastSq = lastSq
+	formats := pr.StreamingData.AdaptiveFormats
+	pmfr := &pr.Microformat.PlayerMicroformatRenderer
 	isLive := pmfr.LiveBroadcastDetails.IsLiveNow
 
-	targetDur := int(streamData.AdaptiveFormats[0].TargetDurationSec)
-	if targetDur > 0 {
-		di.TargetDuration = targetDur
+	if len(formats) > 0 {
+		targetDur := int(formats[0].TargetDurationSec)
+		if targetDur > 0 {
+			di.TargetDuration = targetDur
+		}
 	}
-	dlUrls := di.GetDownloadUrls(pr)
 
 	if len(dlUrls) == 0 {
 		LogError("No download URLs found")
@@ -701,16 +752,18 @@ func (di *DownloadInfo) GetVideoInfo() bool {
 	}
 
 	if di.Quality < 0 {
-		var qualities []string
+		qualities := make([]string, 0, len(VideoQualities))
 		qualities = append(qualities, "audio_only")
 		found := false
 
+		// VideoQualities is already ordered from worst to best, so the list
+		// comes out in order without any sorting
 		for _, qlabel := range VideoQualities {
 			videoItag := VideoLabelItags[qlabel]
 			_, vp9Ok := dlUrls[videoItag.VP9]
 			_, h264Ok := dlUrls[videoItag.H264]
 
-			if Contains(qualities, qlabel) || (!vp9Ok && !h264Ok) {
+			if !vp9Ok && !h264Ok {
 				continue
 			}
 			qualities = append(qualities, qlabel)
@@ -818,8 +871,12 @@ func (di *DownloadInfo) downloadFragment(state *fragThreadState, dataChan chan<-
 			state.Tries = 0 // just in case someone actually somehow lets something run long enough to cause an overflow
 		}
 
-		baseUrl := di.GetDownloadUrl(state.DataType)
-		seqUrl := fmt.Sprintf(baseUrl, state.SeqNum)
+		baseUrl, host := di.GetDownloadUrlAndHost(state.DataType)
+		if baseUrl != state.URLTemplate {
+			state.URLTemplate = baseUrl
+			state.URLPrefix, state.URLSuffix = SplitSeqUrl(baseUrl)
+		}
+		seqUrl := state.URLPrefix + strconv.Itoa(state.SeqNum) + state.URLSuffix
 
 		req, err := http.NewRequest("GET", seqUrl, nil)
 		if err != nil {
@@ -830,7 +887,6 @@ func (di *DownloadInfo) downloadFragment(state *fragThreadState, dataChan chan<-
 		dlStart := time.Now()
 
 		if req != nil {
-			host := di.GetDownloadUrlHost(state.DataType)
 			if len(host) > 0 {
 				req.Header.Add("Host", host)
 				req.Header.Add("Referer", fmt.Sprintf("https://%s/", host))
@@ -856,11 +912,21 @@ func (di *DownloadInfo) downloadFragment(state *fragThreadState, dataChan chan<-
 			continue
 		}
 
-		respData, err := io.ReadAll(resp.Body)
+		respData := fragBufferPool.Get().(*bytes.Buffer)
+		respData.Reset()
+		// Size the buffer once up front when the length is known instead of
+		// growing it repeatedly while reading. ReadFrom wants MinRead bytes
+		// free before each read, including the one that hits EOF. Anything
+		// claiming to be larger than a sane fragment just grows as it's read.
+		if resp.ContentLength > 0 && resp.ContentLength <= MaxFragPresize {
+			respData.Grow(int(resp.ContentLength) + bytes.MinRead)
+		}
+		_, err = respData.ReadFrom(resp.Body)
 		resp.Body.Close()
 		dlDuration := time.Since(dlStart)
 
 		if err != nil {
+			fragBufferPool.Put(respData)
 			HandleFragDownloadError(di, state, err)
 
 			state.Tries += 1
@@ -873,6 +939,7 @@ func (di *DownloadInfo) downloadFragment(state *fragThreadState, dataChan chan<-
 		}
 
 		if resp.StatusCode >= 400 {
+			fragBufferPool.Put(respData)
 			HandleFragHttpError(di, state, resp.StatusCode, baseUrl)
 
 			state.Tries += 1
@@ -888,7 +955,8 @@ func (di *DownloadInfo) downloadFragment(state *fragThreadState, dataChan chan<-
 			The request was a success but no data was given
 			Increment the try counter and wait
 		*/
-		if len(respData) == 0 {
+		if respData.Len() == 0 {
+			fragBufferPool.Put(respData)
 			state.Tries += 1
 			if !ContinueFragmentDownload(di, state) {
 				return
@@ -912,7 +980,8 @@ func (di *DownloadInfo) downloadFragment(state *fragThreadState, dataChan chan<-
 		}
 
 		if state.ToFile {
-			err = os.WriteFile(fname, respData, 0644)
+			err = os.WriteFile(fname, respData.Bytes(), 0644)
+			fragBufferPool.Put(respData)
 			if err != nil {
 				LogDebug("%s: Failed to write fragment %d to file: %s", state.Name, state.SeqNum, err)
 				di.PrintStatus()
@@ -927,7 +996,7 @@ func (di *DownloadInfo) downloadFragment(state *fragThreadState, dataChan chan<-
 				continue
 			}
 		} else {
-			data = bytes.NewBuffer(respData)
+			data = respData
 		}
 
 		// Fragment took more than 1.5x its length to download and is not that close to the current max seq
@@ -949,7 +1018,7 @@ func (di *DownloadInfo) downloadFragment(state *fragThreadState, dataChan chan<-
 	}
 }
 
-func (di *DownloadInfo) DownloadFrags(dataType string, seqChan <-chan *seqChanInfo, dataChan chan<- *Fragment, name string) {
+func (di *DownloadInfo) DownloadFrags(dataType string, seqChan <-chan seqChanInfo, dataChan chan<- *Fragment, name string) {
 	defer di.DecrementJobs(dataType)
 	state := NewFragThreadState(
 		name,
@@ -982,7 +1051,7 @@ func (di *DownloadInfo) DownloadFrags(dataType string, seqChan <-chan *seqChanIn
 
 func (di *DownloadInfo) DownloadStream(dataType, dataFile string, progressChan chan<- *ProgressInfo, done chan<- struct{}) {
 	dataChan := make(chan *Fragment, di.Jobs*2)
-	seqChan := make(chan *seqChanInfo, di.Jobs*2)
+	seqChan := make(chan seqChanInfo, di.Jobs*2)
 	closed := false
 	curFrag := 0
 	startFrag := 0
@@ -993,9 +1062,12 @@ func (di *DownloadInfo) DownloadStream(dataType, dataFile string, progressChan c
 	slowFrags := 0
 	lastSlowFrag := 0
 	itag := 0
-	dataToWrite := make([]*Fragment, 0, di.Jobs)
+	dataToWrite := make(map[int]*Fragment, di.Jobs*2)
+	// Only used for the start of each fragment, where the atoms we strip are found
+	buf := make([]byte, BufferSize)
 	deletingFrags := make([]string, 0, 1)
 	logName := fmt.Sprintf("%s-download", dataType)
+	nextRefresh := time.Now().Add(time.Hour - di.GetTimeSinceUpdated())
 	var f *os.File
 	var err error
 	defer func() { done <- struct{}{} }()
@@ -1046,22 +1118,62 @@ func (di *DownloadInfo) DownloadStream(dataType, dataFile string, progressChan c
 	}
 	defer f.Close()
 
-	for di.GetActiveJobCount(dataType) < di.Jobs {
+	for jobNum <= di.Jobs {
 		jobName := fmt.Sprintf("%s%d", dataType, jobNum)
 		di.IncrementJobs(dataType)
-		seqChan <- &seqChanInfo{curSeq, maxSeqs}
+		seqChan <- seqChanInfo{curSeq, maxSeqs}
 		curSeq += 1
 		activeDownloads += 1
 		jobNum += 1
 		go di.DownloadFrags(dataType, seqChan, dataChan, jobName)
 	}
 
+	dataReceived := false
+	receiveData := func(data *Fragment, downloading, stopping bool) {
+		dataReceived = true
+		dataToWrite[data.Seq] = data
+		activeDownloads -= 1
+
+		if !downloading || stopping || closed {
+			return
+		}
+
+		if data.XHeadSeqNum > maxSeqs {
+			maxSeqs = data.XHeadSeqNum
+		}
+
+		if maxSeqs > 0 {
+			for (curSeq <= maxSeqs+1 && activeDownloads < di.Jobs) || activeDownloads < 1 {
+				seqChan <- seqChanInfo{curSeq, maxSeqs}
+				curSeq += 1
+				activeDownloads += 1
+			}
+		} else {
+			seqChan <- seqChanInfo{curSeq, maxSeqs}
+			curSeq += 1
+			activeDownloads += 1
+		}
+
+		if data.Slow {
+			// Only increment if it's been less than 10 frags since the last slow one
+			// Reset the counter otherwise. Should hopefully prevent getting rid of
+			// an otherwise good download url
+			if (data.Seq - lastSlowFrag) < 10 {
+				slowFrags += 1
+			} else {
+				slowFrags = 1
+			}
+
+			lastSlowFrag = data.Seq
+		}
+	}
+
 	for {
-		dataReceived := false
-		downloading := di.GetActiveJobCount(dataType) > 0
+		activeJobs, finished := di.GetJobStatus(dataType)
+		downloading := activeJobs > 0
 		stopping := di.IsStopping()
 
-		if stopping || !downloading || di.IsFinished(dataType) {
+		if stopping || !downloading || finished {
 			if !closed {
 				close(seqChan)
 				closed = true
@@ -1075,42 +1187,7 @@ func (di *DownloadInfo) DownloadStream(dataType, dataFile string, progressChan c
 		for {
 			select {
 			case data := <-dataChan:
-				dataReceived = true
-				dataToWrite = append(dataToWrite, data)
-				activeDownloads -= 1
-
-				if !downloading || stopping || closed {
-					continue
-				}
-
-				if data.XHeadSeqNum > maxSeqs {
-					maxSeqs = data.XHeadSeqNum
-				}
-
-				if maxSeqs > 0 {
-					for (curSeq <= maxSeqs+1 && activeDownloads < di.Jobs) || activeDownloads < 1 {
-						seqChan <- &seqChanInfo{curSeq, maxSeqs}
-						curSeq += 1
-						activeDownloads += 1
-					}
-				} else {
-					seqChan <- &seqChanInfo{curSeq, maxSeqs}
-					curSeq += 1
-					activeDownloads += 1
-				}
-
-				if data.Slow {
-					// Only increment if it's been less than 10 frags since the last slow one
-					// Reset the counter otherwise. Should hopefully prevent getting rid of
-					// an otherwise good download url
-					if (data.Seq - lastSlowFrag) < 10 {
-						slowFrags += 1
-					} else {
-						slowFrags = 1
-					}
-
-					lastSlowFrag = data.Seq
-				}
+				receiveData(data, downloading, stopping)
 			default:
 				break getData
 			}
@@ -1122,28 +1199,37 @@ func (di *DownloadInfo) DownloadStream(dataType, dataFile string, progressChan c
 				LogDebug("%s: Fragment this happened at: %d", logName, curFrag)
 				di.PrintStatus()
 
-				for activeDownloads < di.GetActiveJobCount(dataType) {
-					seqChan <- &seqChanInfo{curSeq, maxSeqs}
+				for activeDownloads < activeJobs {
+					seqChan <- seqChanInfo{curSeq, maxSeqs}
 					curSeq += 1
 					activeDownloads += 1
 				}
 			}
 
-			time.Sleep(100 * time.Millisecond)
+			// Wake up as soon as the next fragment arrives instead of always
+			// sleeping. The timeout keeps the job and stop checks above running.
+			select {
+			case data := <-dataChan:
+				receiveData(data, downloading, stopping)
+			case <-time.After(100 * time.Millisecond):
+			}
+
 			continue
 		}
+		dataReceived = false
 
-		i := 0
-		for i < len(dataToWrite) && tries > 0 {
-			data := dataToWrite[i]
-			if data.Seq != curFrag {
-				i += 1
-				continue
+		// Write out every fragment we have in order, stopping at the first gap
+		for tries > 0 {
+			data, ok := dataToWrite[curFrag]
+			if !ok {
+				break
 			}
 
-			if di.FragFiles {
-				readBytes, err := os.ReadFile(data.FileName)
+			var src io.Reader
+			var fragFile *os.File
 
+			if di.FragFiles {
+				fragFile, err = os.Open(data.FileName)
 				if err != nil {
 					tries -= 1
 					LogWarn("%s: Error when attempting to read fragment %d for writing: %s", logName, curFrag, err)
@@ -1157,15 +1243,16 @@ func (di *DownloadInfo) DownloadStream(dataType, dataFile string, progressChan c
 					continue
 				}
 
-				data.Data = bytes.NewBuffer(readBytes)
+				src = fragFile
+			} else {
+				// Read through a separate reader so a failed write can be retried
+				src = bytes.NewReader(data.Data.Bytes())
 			}
 
 			bytesWritten := 0
-			buf := make([]byte, BufferSize)
+			rc, _ := io.ReadFull(src, buf)
 
-			rc, _ := data.Data.Read(buf)
-
-			writeBuf := buf
+			writeBuf := buf[:rc]
 			// ffmpeg doesn't like certain atoms in concatenated MP4 files, so we remove those here
 			// If MimeType is blank, assume MP4
 			if strings.HasSuffix(data.MimeType, "/mp4") || data.MimeType == "" {
@@ -1174,12 +1261,27 @@ func (di *DownloadInfo) DownloadStream(dataType, dataFile string, progressChan c
 				if curFrag != startFrag {
 					badAtoms = append(badAtoms, "ftyp")
 				}
-				writeBuf = RemoveAtoms(buf[:rc], badAtoms...)
+				writeBuf = RemoveAtoms(writeBuf, badAtoms...)
 			}
 
 			count, err := f.Write(writeBuf)
 			bytesWritten += count
 
+			/*
+				The rest of the fragment needs no changes. io.Copy lets the copy
+				happen in the kernel when copying between files (copy_file_range
+				on Linux), and writes in-memory fragments with a single call.
+			*/
+			if err == nil {
+				var copied int64
+				copied, err = io.Copy(f, src)
+				bytesWritten += int(copied)
+			}
+
+			if fragFile != nil {
+				fragFile.Close()
+			}
+
 			if err != nil {
 				tries -= 1
 				LogWarn("%s: Error when attempting to write fragment %d to %s: %s", logName, curFrag, dataFile, err)
@@ -1187,7 +1289,7 @@ func (di *DownloadInfo) DownloadStream(dataType, dataFile string, progressChan c
 
 				// If we errored but wrote some data, set the offset back to
 				// where we want to write the fragment
-				f.Seek(int64(bytesWritten), 1)
+				f.Seek(-int64(bytesWritten), io.SeekCurrent)
 
 				if tries > 0 {
 					LogWarn("%s: Will try %d more time(s)", logName, tries)
@@ -1197,38 +1299,12 @@ func (di *DownloadInfo) DownloadStream(dataType, dataFile string, progressChan c
 				continue
 			}
 
-			for {
-				count, err = data.Data.Read(buf)
-				if err != nil {
-					break
-				}
-
-				count, err = f.Write(buf[:count])
-				bytesWritten += count
-
-				if err != nil {
-					tries -= 1
-					LogWarn("%s: Error when attempting to write fragment %d to %s: %s", logName, curFrag, dataFile, err)
-					di.PrintStatus()
-
-					f.Seek(int64(bytesWritten), 1)
-
-					if tries > 0 {
-						LogWarn("%s: Will try %d more time(s)", logName, tries)
-						di.PrintStatus()
-					}
-
-					break
-				}
-			}
-
-			// something didn't work
-			if err != nil && err != io.EOF {
-				continue
-			}
-
 			curFrag += 1
 			progressChan <- &ProgressInfo{itag, bytesWritten, maxSeqs, startFrag}
+			if data.Data != nil {
+				fragBufferPool.Put(data.Data)
+				data.Data = nil
+			}
 
 			if di.FragFiles {
 				err = os.Remove(data.FileName)
@@ -1240,18 +1316,25 @@ func (di *DownloadInfo) DownloadStream(dataType, dataFile string, progressChan c
 				}
 			}
 
-			dataToWrite = append(dataToWrite[:i], dataToWrite[i+1:]...)
+			delete(dataToWrite, data.Seq)
 			tries = 10
-			i = 0
 		}
 
 		if !downloading {
 			break
 		}
 
-		updateDelta := di.GetTimeSinceUpdated()
-		if !stopping && !di.IsUnavailable() && updateDelta > time.Hour {
-			di.GetVideoInfo()
+		/*
+			Other goroutines can refresh the info too, so check the real time
+			since the last update once the deadline passes and then move the
+			deadline to an hour after whichever refresh was most recent.
+		*/
+		if !stopping && time.Now().After(nextRefresh) {
+			if !di.IsUnavailable() && di.GetTimeSinceUpdated() > time.Hour {
+				di.GetVideoInfo()
+			}
+
+			nextRefresh = time.Now().Add(time.Hour - di.GetTimeSinceUpdated())
 		}
 
 		if tries <= 0 {
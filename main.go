@@ -140,7 +140,8 @@ Options:
 		Keep fragment data in memory instead of writing to an intermediate file.
 		This has the possibility to drastically increase RAM usage if a fragment
 		downloads particularly slowly as more fragments after it finish first.
-		This is only an issue when --threads >1
+		With --threads 1 (the default) fragments are always kept in memory, and
+		this flag has no effect.
 		Highly recommended if you don't have strict RAM limitations. Especially
 		on Wangblows, which has caused issues with file locking when trying to
 		delete fragment files.
@@ -560,6 +561,10 @@ func run() int {
 
 	if threadCount > 1 {
 		info.Jobs = int(threadCount)
+	} else {
+		// A single downloader per stream hands over fragments in order and
+		// they are written right away, so there is no point going to disk
+		info.FragFiles = false
 	}
 
 	if monitorChannel {
@@ -793,36 +798,59 @@ func run() int {
 	signal.Notify(sigChan, os.Interrupt)
 
 	maxSeq := -1
+	updatedItags := make(map[int]bool, 2)
 	for {
 		select {
 		case progress := <-progressChan:
-			info.DLState[progress.Itag].Size += int64(progress.ByteCount)
-			info.DLState[progress.Itag].Fragments += 1
-			totalBytes += int64(progress.ByteCount)
-			info.SaveState(progress.Itag)
+			/*
+				Take everything that is already queued before saving state and
+				building the status line, so a burst of fragments costs one state
+				write per format and one status print instead of one of each per
+				fragment.
+			*/
+		drain:
+			for {
+				info.DLState[progress.Itag].Size += int64(progress.ByteCount)
+				info.DLState[progress.Itag].Fragments += 1
+				totalBytes += int64(progress.ByteCount)
+				updatedItags[progress.Itag] = true
+
+				if progress.MaxSeq > maxSeq {
+					maxSeq = progress.MaxSeq
+				}
+
+				select {
+				case next := <-progressChan:
+					progress = next
+				default:
+					break drain
+				}
+			}
 
-			if progress.MaxSeq > maxSeq {
-				maxSeq = progress.MaxSeq
+			for itag := range updatedItags {
+				info.SaveState(itag)
+				delete(updatedItags, itag)
 			}
 
-			status := "\r"
-			if statusNewlines {
-				status = ""
+			var status strings.Builder
+			if !statusNewlines {
+				status.WriteByte('\r')
 			}
 
-			status += fmt.Sprintf("Video Fragments: %d; Audio Fragments: %d; ", info.DLState[info.Quality].Fragments, info.DLState[AudioItag].Fragments)
+			fmt.Fprintf(&status, "Video Fragments: %d; Audio Fragments: %d; ", info.DLState[info.Quality].Fragments, info.DLState[AudioItag].Fragments)
 			if verbose {
-				status += fmt.Sprintf("Max Fragments: %d; Max Sequence: %d; ", (maxSeq - progress.StartFrag), maxSeq)
+				fmt.Fprintf(&status, "Max Fragments: %d; Max Sequence: %d; ", (maxSeq - progress.StartFrag), maxSeq)
 			}
 
-			status += fmt.Sprintf("Total Downloaded: %s", FormatSize(totalBytes))
+			status.WriteString("Total Downloaded: ")
+			status.WriteString(FormatSize(totalBytes))
 			if statusNewlines {
-				status += "\n"
+				status.WriteByte('\n')
 			} else {
-				status += "\033[K"
+				status.WriteString("\033[K")
 			}
 
-			info.SetStatus(status)
+			info.SetStatus(status.String())
 		case <-sigChan:
 			signal.Reset(os.Interrupt)
 			info.Stop()
@@ -165,6 +165,11 @@ type RichGridContent struct {
 // Search the given HTML for the player response object
 func GetJsonFromHtml(htmlData []byte, jsonDecl []byte) []byte {
 	var objData []byte
+	htmlData = SliceFromScriptWith(htmlData, jsonDecl)
+	if htmlData == nil {
+		return objData
+	}
+
 	reader := bytes.NewReader(htmlData)
 	tokenizer := html.NewTokenizer(reader)
 	isScript := false
@@ -429,19 +434,22 @@ func (di *DownloadInfo) GetPlayablePlayerResponse() (retrieved int, pr *PlayerRe
 				LogWarn("Video details no longer available mid download.")
 				LogWarn("Stream was likely privated after finishing.")
 				LogWarn("We will continue to download, but if it starts to fail, nothing can be done.")
-				di.printStatusWithoutLock()
+				di.PrintStatus()
 			}
 
 			LogError("Video Details not found, video is likely private or does not exist.")
-			di.Live = false
-			di.Unavailable = true
+			di.SetLive(false)
+			di.SetUnavailable()
 
 			return PlayerResponseNotUsable, nil, nil
 		}
 
-		if len(pr.PlayabilityStatus.LiveStreamability.LiveStreamabilityRenderer.VideoID) == 0 && !pr.VideoDetails.IsLiveContent {
-			if di.Live {
-				di.Live = false
+		liveStreamability := &pr.PlayabilityStatus.LiveStreamability.LiveStreamabilityRenderer
+		liveDetails := &pr.Microformat.PlayerMicroformatRenderer.LiveBroadcastDetails
+
+		if len(liveStreamability.VideoID) == 0 && !pr.VideoDetails.IsLiveContent {
+			if di.IsLive() {
+				di.SetLive(false)
 			} else {
 				LogError("%s is not a livestream. It would be better to use yt-dlp to download it.", di.URL)
 			}
@@ -456,7 +464,7 @@ func (di *DownloadInfo) GetPlayablePlayerResponse() (retrieved int, pr *PlayerRe
 			}
 
 			LogError("Playability status: ERROR. Reason: %s", pr.PlayabilityStatus.Reason)
-			di.Live = false
+			di.SetLive(false)
 
 			return PlayerResponseNotUsable, nil, nil
 
@@ -468,9 +476,9 @@ func (di *DownloadInfo) GetPlayablePlayerResponse() (retrieved int, pr *PlayerRe
 			LogError("Logged in status: %t", loggedIn)
 			LogError("If this is a members only stream, you provided a cookies.txt file, and the above 'logged in' status is not True, please try updating your cookies file.")
 
-			di.Unavailable = true
+			di.SetUnavailable()
 			if di.InProgress {
-				di.printStatusWithoutLock()
+				di.PrintStatus()
 			}
 
 			return PlayerResponseNotUsable, nil, nil
@@ -528,8 +536,7 @@ func (di *DownloadInfo) GetPlayablePlayerResponse() (retrieved int, pr *PlayerRe
 				continue
 			}
 
-			schedTime, err := strconv.ParseInt(pr.PlayabilityStatus.LiveStreamability.LiveStreamabilityRenderer.OfflineSlate.LiveStreamOfflineSlateRenderer.ScheduledStartTime,
-				10, 64)
+			schedTime, err := strconv.ParseInt(liveStreamability.OfflineSlate.LiveStreamOfflineSlateRenderer.ScheduledStartTime, 10, 64)
 			if err != nil {
 				LogWarn("Failed to get stream start time: %s.", err)
 				LogWarn("Falling back to polling.")
@@ -549,9 +556,7 @@ func (di *DownloadInfo) GetPlayablePlayerResponse() (retrieved int, pr *PlayerRe
 				firstWait = false
 				secsLate = 0
 
-				LogGeneral("Stream starts at %s in %d seconds. ",
-					pr.Microformat.PlayerMicroformatRenderer.LiveBroadcastDetails.StartTimestamp,
-					slepTime)
+				LogGeneral("Stream starts at %s in %d seconds. ", liveDetails.StartTimestamp, slepTime)
 				LogGeneral("Waiting for this time to elapse...")
 
 				// Loop it just in case a rogue sleep interrupt happens
@@ -593,8 +598,7 @@ func (di *DownloadInfo) GetPlayablePlayerResponse() (retrieved int, pr *PlayerRe
 			}
 
 			di.printChannelAndTitle(pr)
-			streamData := pr.StreamingData
-			liveDetails := pr.Microformat.PlayerMicroformatRenderer.LiveBroadcastDetails
+			formats := pr.StreamingData.AdaptiveFormats
 			isLive := liveDetails.IsLiveNow
 
 			if !isLive && !di.InProgress {
@@ -604,14 +608,14 @@ func (di *DownloadInfo) GetPlayablePlayerResponse() (retrieved int, pr *PlayerRe
 					If not, then download it.
 				*/
 				if len(liveDetails.EndTimestamp) > 0 {
-					if len(streamData.AdaptiveFormats) > 0 {
+					if len(formats) > 0 {
 						// Assume that all formats will be fully processed if one is, and vice versa
-						if len(streamData.AdaptiveFormats[0].URL) == 0 {
+						if len(formats[0].URL) == 0 {
 							LogGeneral("Livestream has ended and is being processed. Download URLs not available.")
 							return PlayerResponseNotUsable, nil, nil
 						}
 
-						if !IsFragmented(streamData.AdaptiveFormats[0].URL) {
+						if !IsFragmented(formats[0].URL) {
 							LogGeneral("Livestream has been processed. Use yt-dlp instead.")
 							return PlayerResponseNotUsable, nil, nil
 						}
@@ -642,7 +646,7 @@ func (di *DownloadInfo) GetPlayablePlayerResponse() (retrieved int, pr *PlayerRe
 
 			LogError("Unknown playability status: %s", pr.PlayabilityStatus.Status)
 			if di.InProgress {
-				di.Live = false
+				di.SetLive(false)
 			}
 
 			return PlayerResponseNotUsable, nil, nil
@@ -5,6 +5,7 @@ import (
 	"bytes"
 	"context"
 	"crypto/sha1"
+	"encoding/binary"
 	"encoding/hex"
 	"encoding/xml"
 	"errors"
@@ -19,7 +20,6 @@ import (
 	"os/signal"
 	"path/filepath"
 	"regexp"
-	"sort"
 	"strconv"
 	"strings"
 	"time"
@@ -48,11 +48,6 @@ type MpdDuration struct {
 	D string `xml:"d,attr"`
 }
 
-type Atom struct {
-	Offset int
-	Length int
-}
-
 type FFMpegArgs struct {
 	Args     []string
 	FileName string
@@ -507,55 +502,76 @@ func InsertStringAt(arr []string, idx int, s string) []string {
 	return arr
 }
 
-func GetAtoms(data []byte) map[string]Atom {
-	atoms := make(map[string]Atom)
+/*
+Remove the named top-level atoms from the given data, editing it in place.
+Kept atoms are moved down over removed ones in a single pass. Anything after
+the last complete atom is kept as is.
+*/
+func RemoveAtoms(data []byte, atomList ...string) []byte {
+	// A plain byte search is far cheaper than walking the atom headers,
+	// so skip the walk when none of the names appear in the data at all
+	found := false
+	for _, atomName := range atomList {
+		if bytes.Contains(data, []byte(atomName)) {
+			found = true
+			break
+		}
+	}
+
+	if !found {
+		return data
+	}
+
 	ofs := 0
+	keepLen := 0
 
-	for {
-		if ofs+8 >= len(data) {
+	for ofs+8 < len(data) {
+		aLen := int(binary.BigEndian.Uint32(data[ofs : ofs+4]))
+
+		// Sizes below the 8 byte header are the special 0 (to end of file) and
+		// 1 (64-bit size) cases, neither of which we can step over here
+		if aLen < 8 || ofs+aLen > len(data) {
 			break
 		}
 
-		lenHex := hex.EncodeToString(data[ofs : ofs+4])
-		aLen, err := strconv.ParseInt(lenHex, 16, 0)
+		remove := false
+		aName := data[ofs+4 : ofs+8]
+		for _, atomName := range atomList {
+			if string(aName) == atomName {
+				remove = true
+				break
+			}
+		}
 
-		if err != nil || int(aLen) > len(data) {
-			break
+		if !remove {
+			keepLen += copy(data[keepLen:], data[ofs:ofs+aLen])
 		}
 
-		aName := string(data[ofs+4 : ofs+8])
-		atoms[aName] = Atom{Offset: ofs, Length: int(aLen)}
-		ofs += int(aLen)
+		ofs += aLen
 	}
 
-	return atoms
+	keepLen += copy(data[keepLen:], data[ofs:])
+	return data[:keepLen]
 }
 
-func RemoveAtoms(data []byte, atomList ...string) []byte {
-	atoms := GetAtoms(data)
-
-	var atomsToRemove []Atom
-	for _, atomName := range atomList {
-		atom, ok := atoms[atomName]
-		if !ok {
-			continue
-		}
-		atomsToRemove = append(atomsToRemove, atom)
+/*
+Get the data starting from the script tag that contains the first occurrence of
+the given marker, or nil if the marker is not in the data at all.
+A plain byte search is much faster than tokenizing an entire watch page just to
+find the one script element we care about.
+*/
+func SliceFromScriptWith(htmlData, marker []byte) []byte {
+	markerIdx := bytes.Index(htmlData, marker)
+	if markerIdx < 0 {
+		return nil
 	}
 
-	// Sort atoms by byte offset in descending order,
-	// this lets us remove them in order without affecting the next atom's offset
-	sort.Slice(atomsToRemove, func(i, j int) bool {
-		return atomsToRemove[i].Offset > atomsToRemove[j].Offset
-	})
-
-	for _, atom := range atomsToRemove {
-		ofs := atom.Offset
-		rlen := atom.Offset + atom.Length
-		data = append(data[:ofs], data[rlen:]...)
+	scriptIdx := bytes.LastIndex(htmlData[:markerIdx], []byte("<script"))
+	if scriptIdx < 0 {
+		return htmlData
 	}
 
-	return data
+	return htmlData[scriptIdx:]
 }
 
 func GetVideoIdFromWatchPage(data []byte) string {
@@ -581,8 +597,9 @@ func ParseGvideoUrl(gvUrl, dataType string) (string, int) {
 	gvUrl = strings.ReplaceAll(gvUrl, "%", "%%")
 	lowerHost := strings.ToLower(parsedUrl.Hostname())
 	sqIndex := strings.Index(gvUrl, "&sq=")
+	query := parsedUrl.Query()
 
-	itag, err := strconv.Atoi(parsedUrl.Query().Get("itag"))
+	itag, err := strconv.Atoi(query.Get("itag"))
 	if err != nil {
 		LogError("Error parsing itag in Google Video URL: %s", err)
 		return newUrl, 0
@@ -590,7 +607,7 @@ func ParseGvideoUrl(gvUrl, dataType string) (string, int) {
 
 	if !strings.HasSuffix(lowerHost, ".googlevideo.com") {
 		return newUrl, 0
-	} else if _, ok := parsedUrl.Query()["noclen"]; !ok {
+	} else if !query.Has("noclen") {
 		LogGeneral("Given Google Video URL is not for a fragmented stream.")
 		return newUrl, 0
 	} else if dataType == DtypeAudio && itag != AudioItag {
@@ -609,6 +626,43 @@ func ParseGvideoUrl(gvUrl, dataType string) (string, int) {
 	return newUrl, itag
 }
 
+/*
+Split a fragment URL template around its %d verb, undoing the %% escapes, so
+sequence numbers can be put in with plain concatenation instead of fmt.
+*/
+func SplitSeqUrl(urlTemplate string) (string, string) {
+	var sb strings.Builder
+	prefix := ""
+	found := false
+	sb.Grow(len(urlTemplate))
+
+	for i := 0; i < len(urlTemplate); i++ {
+		c := urlTemplate[i]
+		if c == '%' && i+1 < len(urlTemplate) {
+			next := urlTemplate[i+1]
+			if next == '%' {
+				sb.WriteByte('%')
+				i += 1
+				continue
+			} else if next == 'd' && !found {
+				prefix = sb.String()
+				sb.Reset()
+				found = true
+				i += 1
+				continue
+			}
+		}
+
+		sb.WriteByte(c)
+	}
+
+	if !found {
+		return sb.String(), ""
+	}
+
+	return prefix, sb.String()
+}
+
 func RefreshURL(di *DownloadInfo, dataType, currentUrl string) {
 	if !di.IsGVideoDDL() {
 		newUrl := di.GetDownloadUrl(dataType)
@@ -692,8 +746,9 @@ func HandleFragDownloadError(di *DownloadInfo, state *fragThreadState, err error
 	}
 }
 
+// Move the given file, doing nothing if it does not exist
 func TryMove(srcFile, dstFile string) error {
-	_, err := os.Stat(srcFile)
+	err := os.Rename(srcFile, dstFile)
 	if err != nil {
 		if !errors.Is(err, os.ErrNotExist) {
 			LogWarn("Error moving file: %s", err)
@@ -703,19 +758,13 @@ func TryMove(srcFile, dstFile string) error {
 		return nil
 	}
 
-	LogInfo("Moving file %s to %s", srcFile, dstFile)
-
-	err = os.Rename(srcFile, dstFile)
-	if err != nil && !errors.Is(err, os.ErrNotExist) {
-		LogWarn("Error moving file: %s", err)
-		return err
-	}
-
+	LogInfo("Moved file %s to %s", srcFile, dstFile)
 	return nil
 }
 
+// Delete the given file, doing nothing if it does not exist
 func TryDelete(fname string) {
-	_, err := os.Stat(fname)
+	err := os.Remove(fname)
 	if err != nil {
 		if !errors.Is(err, os.ErrNotExist) {
 			LogWarn("Error deleting file: %s", err)
@@ -724,11 +773,7 @@ func TryDelete(fname string) {
 		return
 	}
 
-	LogInfo("Deleting file %s", fname)
-	err = os.Remove(fname)
-	if err != nil && !errors.Is(err, os.ErrNotExist) {
-		LogWarn("Error deleting file: %s", err)
-	}
+	LogInfo("Deleted file %s", fname)
 }
 
 // Call os.Stat and check if err is os.ErrNotExist
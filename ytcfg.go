@@ -27,6 +27,11 @@ type YTCFG struct {
 // Search the given HTML for the ytcfg object
 func GetYTCFGFromHtml(data []byte) []byte {
 	var objData []byte
+	data = SliceFromScriptWith(data, ytcfgStart)
+	if data == nil {
+		return objData
+	}
+
 	reader := bytes.NewReader(data)
 	tokenizer := html.NewTokenizer(reader)
 	isScript := false